@@ -0,0 +1,12 @@
+import enum
+
+
+class HIDException(Exception):
+    pass
+
+class BusType(enum.Enum):
+    UNKNOWN = 0x00
+    USB = 0x01
+    BLUETOOTH = 0x02
+    I2C = 0x03
+    SPI = 0x04
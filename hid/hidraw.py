@@ -0,0 +1,388 @@
+"""Pure Python Linux hidraw backend.
+
+Enumerates devices by scanning sysfs and talks to /dev/hidraw* nodes with
+plain file descriptors and HIDIOC* ioctls, so libhidapi is not needed.
+
+For tests, build_fake_tree() creates a fake sysfs tree and device
+directory and configure() points the backend at them and replaces the
+ioctl function:
+
+    sysfs_root, dev_root = hidraw.build_fake_tree('/tmp/fake', [{
+        'vendor_id': 0x320F, 'product_id': 0x505A, 'interface_number': 2,
+        'report_descriptor': b'\x06\x01\xff\x09\x01\xa1\x01\xc0',
+    }])
+    hidraw.configure(sysfs_root, dev_root, ioctl=fake_ioctl)
+
+A fake tree needs <sysfs_root>/hidrawN/device (directory or symlink) with a
+'uevent' file containing HID_ID/HID_NAME/HID_UNIQ lines and optionally a
+'report_descriptor'. For USB devices the parent directory is the interface
+(bInterfaceNumber) and its parent the device (manufacturer, product,
+serial, bcdDevice).
+"""
+import fcntl
+import os
+import select
+
+from hid._common import HIDException, BusType
+
+__all__ = ['HIDException', 'DeviceInfo', 'Device', 'enumerate', 'BusType',
+           'configure', 'build_fake_tree']
+
+
+SYSFS_ROOT = '/sys/class/hidraw'
+DEV_ROOT = '/dev'
+_ioctl = fcntl.ioctl
+
+_DEFAULTS = (SYSFS_ROOT, DEV_ROOT, _ioctl)
+
+
+def configure(sysfs_root=None, dev_root=None, ioctl=None):
+    """Override the sysfs root, device directory and ioctl (test mode).
+
+    Calling it without arguments restores the real system paths.
+    """
+    global SYSFS_ROOT, DEV_ROOT, _ioctl
+    SYSFS_ROOT = sysfs_root or _DEFAULTS[0]
+    DEV_ROOT = dev_root or _DEFAULTS[1]
+    _ioctl = ioctl or _DEFAULTS[2]
+
+
+def build_fake_tree(root, devices):
+    """Create a fake sysfs tree and device directory below 'root' (test mode).
+
+    'devices' is a list of dicts using the enumerate() keys vendor_id,
+    product_id, interface_number, manufacturer_string, product_string,
+    serial_number and release_number, plus 'report_descriptor' (bytes) and
+    'bus' (linux bus number, USB by default). Returns the sysfs root and
+    device directory to pass to configure().
+    """
+    sysfs_root = os.path.join(root, 'sys', 'class', 'hidraw')
+    dev_root = os.path.join(root, 'dev')
+    os.makedirs(sysfs_root, exist_ok=True)
+    os.makedirs(dev_root, exist_ok=True)
+
+    def write(directory, name, data):
+        with open(os.path.join(directory, name), 'wb') as f:
+            f.write(data if isinstance(data, bytes) else '{}\n'.format(data).encode())
+
+    # enumerate() is shadowed by this module's own enumerate()
+    for n in range(len(devices)):
+        device = devices[n]
+        bus = device.get('bus', 0x03)
+        vid = device.get('vendor_id', 0)
+        pid = device.get('product_id', 0)
+
+        usb_dir = os.path.join(root, 'sys', 'devices', 'usb{}'.format(n), '1-1')
+        interface_dir = os.path.join(usb_dir, '1-1:1.{}'.format(device.get('interface_number', 0)))
+        hid_dir = os.path.join(interface_dir, '{:04X}:{:04X}:{:04X}.{:04X}'.format(bus, vid, pid, n + 1))
+        os.makedirs(hid_dir)
+
+        write(usb_dir, 'manufacturer', device.get('manufacturer_string', ''))
+        write(usb_dir, 'product', device.get('product_string', ''))
+        write(usb_dir, 'serial', device.get('serial_number', ''))
+        write(usb_dir, 'bcdDevice', '{:04x}'.format(device.get('release_number', 0)))
+        write(interface_dir, 'bInterfaceNumber', '{:02x}'.format(device.get('interface_number', 0)))
+        write(hid_dir, 'uevent', 'HID_ID={:04X}:{:08X}:{:08X}\nHID_NAME={}\nHID_UNIQ={}'.format(
+            bus, vid, pid, device.get('product_string', ''), device.get('serial_number', '')))
+        write(hid_dir, 'report_descriptor', device.get('report_descriptor', b''))
+
+        name = 'hidraw{}'.format(n)
+        os.makedirs(os.path.join(sysfs_root, name))
+        os.symlink(hid_dir, os.path.join(sysfs_root, name, 'device'))
+        write(dev_root, name, b'')
+
+    return sysfs_root, dev_root
+
+
+# linux/ioctl.h
+_IOC_WRITE = 1
+_IOC_READ = 2
+
+
+def _IOC(direction, type, nr, size):
+    return (direction << 30) | (size << 16) | (ord(type) << 8) | nr
+
+
+# linux/hidraw.h
+def HIDIOCSFEATURE(length):
+    return _IOC(_IOC_WRITE | _IOC_READ, 'H', 0x06, length)
+
+
+def HIDIOCGFEATURE(length):
+    return _IOC(_IOC_WRITE | _IOC_READ, 'H', 0x07, length)
+
+
+def HIDIOCGINPUT(length):
+    return _IOC(_IOC_WRITE | _IOC_READ, 'H', 0x0A, length)
+
+
+# linux/input.h bus types
+_BUS_TYPES = {
+    0x03: BusType.USB,
+    0x05: BusType.BLUETOOTH,
+    0x18: BusType.I2C,
+    0x1C: BusType.SPI,
+}
+
+_FIELDS = ('path', 'vendor_id', 'product_id', 'serial_number',
+           'release_number', 'manufacturer_string', 'product_string',
+           'usage_page', 'usage', 'interface_number', 'bus_type')
+
+
+class DeviceInfo(object):
+    __slots__ = _FIELDS
+
+    def __init__(self, **fields):
+        for name in _FIELDS:
+            setattr(self, name, fields.get(name))
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in _FIELDS}
+
+
+def _read_attr(directory, name):
+    try:
+        with open(os.path.join(directory, name), 'rb') as f:
+            return f.read().decode('utf-8', 'replace').strip()
+    except OSError:
+        return None
+
+
+def _read_uevent(directory):
+    ret = {}
+    text = _read_attr(directory, 'uevent') or ''
+    for line in text.splitlines():
+        key, sep, value = line.partition('=')
+        if sep:
+            ret[key] = value
+    return ret
+
+
+def _top_level_usages(descriptor):
+    # Same approach as hidapi's linux backend: report the usage page and
+    # usage of every top level collection in the report descriptor.
+    usages = []
+    usage_page = 0
+    usage = None  # (usage page or None, usage) of the last Usage item
+    depth = 0
+    i = 0
+    while i < len(descriptor):
+        key = descriptor[i]
+
+        if key == 0xFE:
+            # Long item: 0xFE, size, tag, data
+            if i + 1 >= len(descriptor):
+                break
+            i += 3 + descriptor[i + 1]
+            continue
+
+        size = (0, 1, 2, 4)[key & 0x03]
+        data = int.from_bytes(descriptor[i + 1:i + 1 + size], 'little')
+        tag = key & 0xFC
+
+        if tag == 0x04:  # Usage Page
+            usage_page = data
+        elif tag == 0x08:  # Usage
+            # Like hidapi, a 4 byte Usage is an extended usage that carries
+            # its own usage page in the upper 16 bits
+            if size == 4:
+                usage = (data >> 16, data & 0xFFFF)
+            else:
+                usage = (None, data)
+        elif tag == 0xA0:  # Collection
+            if depth == 0 and usage is not None:
+                page = usage_page if usage[0] is None else usage[0]
+                usages.append((page, usage[1]))
+            depth += 1
+            usage = None
+        elif tag == 0xC0:  # End Collection
+            depth = max(depth - 1, 0)
+            usage = None
+        elif tag in (0x80, 0x90, 0xB0):  # Input, Output, Feature
+            usage = None
+
+        i += 1 + size
+
+    return usages
+
+
+def _device_infos(name):
+    hid_dir = os.path.realpath(os.path.join(SYSFS_ROOT, name, 'device'))
+    uevent = _read_uevent(hid_dir)
+
+    try:
+        bus, vid, pid = (int(x, 16) for x in uevent['HID_ID'].split(':'))
+    except (KeyError, ValueError):
+        return []
+
+    info = {
+        'path': os.path.join(DEV_ROOT, name).encode(),
+        'vendor_id': vid,
+        'product_id': pid,
+        'serial_number': uevent.get('HID_UNIQ', ''),
+        'release_number': 0,
+        'manufacturer_string': '',
+        'product_string': uevent.get('HID_NAME', ''),
+        'interface_number': -1,
+        'bus_type': _BUS_TYPES.get(bus, BusType.UNKNOWN),
+    }
+
+    if info['bus_type'] is BusType.USB:
+        interface_dir = os.path.dirname(hid_dir)
+        usb_dir = os.path.dirname(interface_dir)
+
+        interface = _read_attr(interface_dir, 'bInterfaceNumber')
+        if interface:
+            info['interface_number'] = int(interface, 16)
+        release = _read_attr(usb_dir, 'bcdDevice')
+        if release:
+            info['release_number'] = int(release, 16)
+        for key, attr in (('manufacturer_string', 'manufacturer'),
+                          ('product_string', 'product'),
+                          ('serial_number', 'serial')):
+            value = _read_attr(usb_dir, attr)
+            if value:
+                info[key] = value
+
+    try:
+        with open(os.path.join(hid_dir, 'report_descriptor'), 'rb') as f:
+            usages = _top_level_usages(f.read())
+    except OSError:
+        usages = []
+
+    ret = []
+    for usage_page, usage in usages or [(0, 0)]:
+        ret.append(DeviceInfo(usage_page=usage_page, usage=usage, **info))
+    return ret
+
+
+def enumerate(vid=0, pid=0):
+    try:
+        names = sorted(os.listdir(SYSFS_ROOT))
+    except OSError:
+        return []
+
+    ret = []
+    for name in names:
+        for info in _device_infos(name):
+            if vid and info.vendor_id != vid:
+                continue
+            if pid and info.product_id != pid:
+                continue
+            ret.append(info.as_dict())
+    return ret
+
+
+class Device(object):
+    def __init__(self, vid=None, pid=None, serial=None, path=None):
+        if not path:
+            if serial:
+                matches = [d for d in enumerate(vid, pid)
+                           if d['serial_number'] == serial]
+            elif vid and pid is not None:
+                matches = enumerate(vid, pid)
+            else:
+                raise ValueError('specify vid/pid or path')
+            if not matches:
+                raise HIDException('unable to open device')
+            path = matches[0]['path']
+
+        if isinstance(path, bytes):
+            path = path.decode()
+
+        try:
+            self.__fd = os.open(path, os.O_RDWR)
+        except OSError as e:
+            raise HIDException('unable to open device: {}'.format(e))
+
+        name = os.path.basename(path)
+        infos = _device_infos(name) if os.path.isdir(os.path.join(SYSFS_ROOT, name)) else []
+        self.__info = infos[0].as_dict() if infos else {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def __hidcall(self, function, *args):
+        if self.__fd is None:
+            raise HIDException('device closed')
+
+        try:
+            return function(self.__fd, *args)
+        except OSError as e:
+            raise HIDException(os.strerror(e.errno) if e.errno else str(e))
+
+    def write(self, data):
+        return self.__hidcall(os.write, bytes(data))
+
+    def read(self, size, timeout=None):
+        if timeout is not None and timeout >= 0 and not self.nonblocking:
+            ready, _, _ = self.__hidcall(
+                lambda fd: select.select([fd], [], [], timeout / 1000.0))
+            if not ready:
+                return b''
+
+        try:
+            return self.__hidcall(os.read, size)
+        except HIDException:
+            if self.nonblocking:
+                return b''
+            raise
+
+    def get_input_report(self, report_id, size):
+        buf = bytearray(size)
+
+        # Pass the id of the report to be read.
+        buf[0] = report_id
+
+        size = self.__hidcall(_ioctl, HIDIOCGINPUT(len(buf)), buf)
+        return bytes(buf[:size])
+
+    def send_feature_report(self, data):
+        buf = bytearray(data)
+        return self.__hidcall(_ioctl, HIDIOCSFEATURE(len(buf)), buf)
+
+    def get_feature_report(self, report_id, size):
+        buf = bytearray(size)
+
+        # Pass the id of the report to be read.
+        buf[0] = report_id
+
+        size = self.__hidcall(_ioctl, HIDIOCGFEATURE(len(buf)), buf)
+        return bytes(buf[:size])
+
+    def close(self):
+        if self.__fd is not None:
+            os.close(self.__fd)
+            self.__fd = None
+
+    @property
+    def nonblocking(self):
+        return getattr(self, '_nonblocking', 0)
+
+    @nonblocking.setter
+    def nonblocking(self, value):
+        flags = self.__hidcall(fcntl.fcntl, fcntl.F_GETFL)
+        if value:
+            flags |= os.O_NONBLOCK
+        else:
+            flags &= ~os.O_NONBLOCK
+        self.__hidcall(fcntl.fcntl, fcntl.F_SETFL, flags)
+        setattr(self, '_nonblocking', value)
+
+    @property
+    def manufacturer(self):
+        return self.__info.get('manufacturer_string', '')
+
+    @property
+    def product(self):
+        return self.__info.get('product_string', '')
+
+    @property
+    def serial(self):
+        return self.__info.get('serial_number', '')
+
+    def get_indexed_string(self, index, max_length=255):
+        raise HIDException('indexed strings are not supported by hidraw')
@@ -0,0 +1,82 @@
+import threading
+import time
+
+from hid.worker import hid_worker
+
+__all__ = ['DeviceRegistry', 'device_registry']
+
+
+class DeviceRegistry(object):
+    """Process-wide cache of the last hid.enumerate() snapshot.
+
+    Lookups are served from the snapshot until it is older than ``ttl``
+    seconds or until invalidate() is called, e.g. after a device error.
+    Enumeration waits at most ``timeout`` seconds for the HID worker and
+    never holds the lock while waiting.
+    """
+
+    def __init__(self, ttl=5.0, timeout=10.0):
+        self.ttl = ttl
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._devices = []
+        self._by_id = {}
+        self._by_key = {}
+        self._timestamp = None
+        self._generation = 0
+
+    def _ensure_fresh(self):
+        with self._lock:
+            if (self._timestamp is not None and
+                    time.monotonic() - self._timestamp < self.ttl):
+                return
+            generation = self._generation
+
+        devices = hid_worker.enumerate().result(self.timeout)
+        by_id = {}
+        by_key = {}
+        for device in devices:
+            vid_pid = (device['vendor_id'], device['product_id'])
+            key = vid_pid + (device['interface_number'], device['usage_page'])
+            by_id.setdefault(vid_pid, []).append(device)
+            by_key.setdefault(key, []).append(device)
+
+        with self._lock:
+            self._devices = devices
+            self._by_id = by_id
+            self._by_key = by_key
+            # An invalidate() during the enumeration keeps the snapshot stale
+            if self._generation == generation:
+                self._timestamp = time.monotonic()
+
+    def invalidate(self):
+        """Drop the snapshot so the next lookup enumerates the bus again"""
+        with self._lock:
+            self._timestamp = None
+            self._generation += 1
+
+    def devices(self):
+        """Return every device in the current snapshot"""
+        self._ensure_fresh()
+        with self._lock:
+            return list(self._devices)
+
+    def find(self, vid, pid, interface=None, usage_page=None):
+        """Return the devices matching VID/PID and optionally interface and usage page"""
+        self._ensure_fresh()
+        with self._lock:
+            if interface is not None and usage_page is not None:
+                return list(self._by_key.get((vid, pid, interface, usage_page), ()))
+
+            matches = self._by_id.get((vid, pid), ())
+            return [device for device in matches
+                    if (interface is None or device['interface_number'] == interface) and
+                    (usage_page is None or device['usage_page'] == usage_page)]
+
+    def find_path(self, vid, pid, interface=None, usage_page=None):
+        """Return the path of the first matching device, or None"""
+        matches = self.find(vid, pid, interface, usage_page)
+        return matches[0]['path'] if matches else None
+
+
+device_registry = DeviceRegistry()
@@ -0,0 +1,175 @@
+import contextlib
+import queue
+import threading
+from concurrent.futures import Future
+
+import hid
+
+__all__ = ['HIDWorker', 'hid_worker']
+
+
+class HIDWorker(object):
+    """Run every hidapi call on one dedicated thread.
+
+    Callers submit operations and get a concurrent.futures.Future back.
+    Whatever is queued when the worker wakes up is handled as one batch:
+    identical enumerations run once and consecutive feature reports for
+    the same path share a single open/close of the device.
+
+    Once stop() has been called the worker is closed for good: later
+    submissions fail their future instead of starting a second thread.
+    """
+
+    def __init__(self):
+        # Optional callable(name) -> context manager, used to time the
+        # open and send phases on the worker thread
+        self.phase_timer = None
+        self._queue = queue.Queue()
+        self._thread = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    @property
+    def thread(self):
+        return self._thread
+
+    def _start_locked(self):
+        if self._closed:
+            raise hid.HIDException('HID worker is stopped')
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name='hid-worker', daemon=True)
+            self._thread.start()
+
+    def start(self):
+        with self._lock:
+            self._start_locked()
+
+    def stop(self, timeout=None):
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+            if thread is not None:
+                # Nothing can be queued after the sentinel once closed is set
+                self._queue.put(None)
+        if thread is not None:
+            thread.join(timeout)
+            if not thread.is_alive():
+                with self._lock:
+                    self._thread = None
+
+    def _submit(self, kind, *args):
+        future = Future()
+        with self._lock:
+            try:
+                self._start_locked()
+            except hid.HIDException as e:
+                future.set_exception(e)
+                return future
+            self._queue.put((kind, args, future))
+        return future
+
+    def submit(self, function, *args):
+        """Run function(*args) on the worker thread"""
+        return self._submit('call', function, *args)
+
+    def enumerate(self, vid=0, pid=0):
+        return self._submit('enumerate', vid, pid)
+
+    def send_feature_report(self, path, data):
+        return self._submit('send', path, data)
+
+    def read(self, path, size, timeout=None):
+        return self._submit('read', path, size, timeout)
+
+    def _phase(self, name):
+        if self.phase_timer is None:
+            return contextlib.nullcontext()
+        return self.phase_timer(name)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in batch
+            self._process([item for item in batch if item is not None])
+            if stop:
+                return
+
+    def _process(self, batch):
+        enumerations = {}
+        i = 0
+        while i < len(batch):
+            kind, args, future = batch[i]
+
+            if kind == 'send':
+                # Combine consecutive sends to the same device
+                sends = [(args[1], future)]
+                while (i + 1 < len(batch) and batch[i + 1][0] == 'send' and
+                       batch[i + 1][1][0] == args[0]):
+                    i += 1
+                    sends.append((batch[i][1][1], batch[i][2]))
+                self._send(args[0], sends)
+
+            elif kind == 'enumerate':
+                if future.set_running_or_notify_cancel():
+                    if args not in enumerations:
+                        enumerations[args] = self._call(hid.enumerate, *args)
+                    self._resolve(future, enumerations[args])
+
+            elif future.set_running_or_notify_cancel():
+                if kind == 'read':
+                    result = self._call(self._read, *args)
+                else:
+                    result = self._call(*args)
+                self._resolve(future, result)
+            i += 1
+
+    @staticmethod
+    def _call(function, *args):
+        try:
+            return True, function(*args)
+        except Exception as e:
+            return False, e
+
+    @staticmethod
+    def _resolve(future, result):
+        ok, value = result
+        if ok:
+            future.set_result(value)
+        else:
+            future.set_exception(value)
+
+    def _send(self, path, sends):
+        sends = [(data, future) for data, future in sends
+                 if future.set_running_or_notify_cancel()]
+        if not sends:
+            return
+
+        try:
+            with self._phase('device open'):
+                device = hid.Device(path=path)
+        except Exception as e:
+            for _, future in sends:
+                future.set_exception(e)
+            return
+
+        try:
+            for data, future in sends:
+                with self._phase('feature report send'):
+                    self._resolve(future, self._call(device.send_feature_report, data))
+        finally:
+            device.close()
+
+    @staticmethod
+    def _read(path, size, timeout):
+        with hid.Device(path=path) as device:
+            return device.read(size, timeout)
+
+
+hid_worker = HIDWorker()
@@ -0,0 +1,174 @@
+"""Idle/usage history kept in a fixed-size memory-mapped ring file.
+
+Every record is RECORD.size bytes, so appending is a struct.pack_into()
+into the mapping plus an update of the write counter in the header. The
+file never grows, once full the oldest records are overwritten.
+
+Run this module to print histograms of a history file:
+
+    python history.py [--file history.bin] [--bins 12]
+"""
+import argparse
+import collections
+import mmap
+import os
+import struct
+import time
+
+# magic, version, record size, capacity, records written
+HEADER = struct.Struct("<4sHHIQ")
+HEADER_SIZE = 32
+MAGIC = b"GMSH"
+VERSION = 1
+
+# timestamp, kind, flag, reserved, value
+RECORD = struct.Struct("<dBBHI")
+
+KIND_IDLE = 0  # flag: ACTIVE state, value: idle time in ms
+KIND_TRANSITION = 1  # flag: new state (1 ACTIVE, 0 IDLE), value: idle time in ms
+KIND_SEND = 2  # flag: success, value: send latency in microseconds
+
+DEFAULT_CAPACITY = 131072  # ~3 days of samples at one per 2 seconds, 2 MiB
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), "history.bin")
+
+Record = collections.namedtuple("Record", "timestamp kind flag value")
+
+
+class HistoryRing:
+    def __init__(self, path=DEFAULT_PATH, capacity=DEFAULT_CAPACITY):
+        self.path = path
+        size = HEADER_SIZE + capacity * RECORD.size
+
+        self._file = open(path, "a+b")
+        try:
+            self._file.seek(0, os.SEEK_END)
+            existing = self._file.tell()
+            if existing != size:
+                self._file.truncate(size)
+            self._map = mmap.mmap(self._file.fileno(), size)
+        except Exception:
+            self._file.close()
+            raise
+
+        magic, version, record_size, file_capacity, count = HEADER.unpack_from(self._map, 0)
+        if (existing != size or magic != MAGIC or version != VERSION or
+                record_size != RECORD.size or file_capacity != capacity):
+            # New file or incompatible layout, start over
+            count = 0
+            HEADER.pack_into(self._map, 0, MAGIC, VERSION, RECORD.size, capacity, count)
+        self.capacity = capacity
+        self.count = count
+
+    def append(self, kind, flag, value, timestamp=None):
+        """Write one record, overwriting the oldest once the ring is full"""
+        offset = HEADER_SIZE + (self.count % self.capacity) * RECORD.size
+        RECORD.pack_into(self._map, offset, timestamp or time.time(), kind, flag, 0,
+                         min(max(int(value), 0), 0xFFFFFFFF))
+        self.count += 1
+        struct.pack_into("<Q", self._map, HEADER.size - 8, self.count)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+            self._file.close()
+
+
+def read_records(path=DEFAULT_PATH):
+    """Return the records of a history file, oldest first"""
+    with open(path, "rb") as f:
+        data = f.read()
+
+    error = f"{path} is not a version {VERSION} history file"
+    if len(data) < HEADER_SIZE:
+        raise ValueError(error)
+
+    magic, version, record_size, capacity, count = HEADER.unpack_from(data, 0)
+    if (magic != MAGIC or version != VERSION or record_size != RECORD.size or
+            len(data) < HEADER_SIZE + capacity * RECORD.size):
+        raise ValueError(error)
+
+    first = max(count - capacity, 0)
+    records = []
+    for i in range(first, count):
+        offset = HEADER_SIZE + (i % capacity) * RECORD.size
+        timestamp, kind, flag, _, value = RECORD.unpack_from(data, offset)
+        records.append(Record(timestamp, kind, flag, value))
+    return records
+
+
+def histogram(values, bins=10):
+    """Bucket values into 'bins' equal-width bins, returns [(low, high, count)]"""
+    if not values:
+        return []
+    low, high = min(values), max(values)
+    width = (high - low) / bins or 1
+    counts = [0] * bins
+    for value in values:
+        counts[min(int((value - low) / width), bins - 1)] += 1
+    return [(low + i * width, low + (i + 1) * width, count) for i, count in enumerate(counts)]
+
+
+def idle_periods(records):
+    """Return the length in seconds of every finished idle period.
+
+    The idle time of consecutive samples keeps growing until input arrives,
+    so the sample before each drop is the length of one idle period.
+    """
+    periods = []
+    previous = None
+    for record in records:
+        if record.kind != KIND_IDLE:
+            continue
+        if previous is not None and record.value < previous:
+            periods.append(previous / 1000)
+        previous = record.value
+    return periods
+
+
+def format_histogram(title, buckets, unit):
+    lines = [title]
+    peak = max((count for _, _, count in buckets), default=0)
+    for low, high, count in buckets:
+        bar = "#" * (round(40 * count / peak) if peak else 0)
+        lines.append(f"  {low:>10.1f} - {high:<10.1f}{unit:<3} {count:>8}  {bar}".rstrip())
+    return "\n".join(lines)
+
+
+def summarize(records, bins=10):
+    """Return a text report of idle durations, transitions and send outcomes"""
+    idle = [r.value / 1000 for r in records if r.kind == KIND_IDLE]
+    transitions = [r for r in records if r.kind == KIND_TRANSITION]
+    sends = [r for r in records if r.kind == KIND_SEND]
+
+    if records:
+        span = (records[-1].timestamp - records[0].timestamp) / 3600
+        lines = [f"{len(records)} records covering {span:.1f} hours"]
+    else:
+        lines = ["No records"]
+
+    lines.append(format_histogram("Idle time (samples):", histogram(idle, bins), "s"))
+
+    lines.append(f"Transitions: {len(transitions)} ({sum(1 for r in transitions if r.flag)} to ACTIVE)")
+    lines.append(format_histogram("Idle period length:", histogram(idle_periods(records), bins), "s"))
+
+    ok = [r.value / 1000 for r in sends if r.flag]
+    lines.append(f"HID sends: {len(sends)} ({len(sends) - len(ok)} failed)")
+    lines.append(format_histogram("Successful send latency:", histogram(ok, bins), "ms"))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a GMMK Sleep history file")
+    parser.add_argument("--file", default=DEFAULT_PATH, help="history file to read")
+    parser.add_argument("--bins", type=int, default=10, help="histogram bins")
+    args = parser.parse_args()
+    try:
+        records = read_records(args.file)
+    except (OSError, ValueError) as e:
+        parser.exit(1, f"Error: {e}\n")
+    print(summarize(records, args.bins))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import ctypes
 from ctypes import wintypes
+import argparse
 import json
 import os
 import re
@@ -9,7 +10,10 @@ import threading
 import time
 
 import pystray
-from PIL import Image
+from PIL import Image, ImageDraw, ImageEnhance, ImageOps
+import history
+import protocols
+from profiler import profiler
 import settings_gui
 
 # Define GUID structure for Power APIs
@@ -37,11 +41,9 @@ class SYSTEM_POWER_STATUS(ctypes.Structure):
         ('BatteryFullLifeTime', ctypes.c_uint32),
     ]
 
-# Load the hidapi.dll from the project directory
-dll_path = os.path.join(os.path.dirname(__file__), "hidapi.dll")
-ctypes.CDLL(dll_path)
-
-import hid
+# hid loads hidapi.dll from the project directory itself
+from hid.registry import device_registry
+from hid.worker import hid_worker
 
 
 # Load VENDOR_ID and PRODUCT_ID from settings.json
@@ -55,10 +57,24 @@ def load_ids():
 
 
 VENDOR_ID, PRODUCT_ID = load_ids()
-INTERFACE = 2  # Interface from Wireshark
-REPORT_LENGTH = 256  # wLength from Wireshark
+PROTOCOL = protocols.get_protocol(VENDOR_ID, PRODUCT_ID)
+INTERFACE = PROTOCOL.interface
+
+PROFILE_WINDOW = 60  # Seconds of stack sampling when profiling is started
+SLEEP_INTERVAL = 2
+HID_TIMEOUT = 10  # Seconds to wait for the HID worker to send a report
 
 stop_event = threading.Event()
+history_ring = None
+
+# Tray state, icons are rendered once by render_tray_icons()
+STATE_ACTIVE = "Active"
+STATE_IDLE = "Idle"
+STATE_DISCONNECTED = "Disconnected"
+tray_icon = None
+tray_icons = {}
+tray_state = STATE_ACTIVE
+last_transition_latency = None
 
 
 def on_exit(icon):
@@ -72,14 +88,85 @@ def on_settings(icon):
     settings_thread.start()
 
 
+def on_toggle_profiling(icon):
+    """Start or stop profiling from the tray, output is written when stopped"""
+    if profiler.enabled:
+        profiler.stop()
+        write_profile()
+    else:
+        start_profiling()
+
+
+def start_profiling():
+    """Start phase timings and sample the main loop and the HID worker"""
+    print("Profiling started")
+    profiler.start(sample_window=PROFILE_WINDOW,
+                   threads=[threading.main_thread(), hid_worker.thread])
+
+
+def write_profile():
+    if not profiler.has_data():
+        return
+    try:
+        profiler.write(os.path.dirname(__file__))
+    except OSError as e:
+        print(f"Warning: Could not write profile - {e}")
+
+
+def render_tray_icons():
+    """Render one tray image per state so state changes only swap references"""
+    base = Image.open(os.path.join(os.path.dirname(__file__), "icon.png")).convert("RGBA")
+
+    idle = ImageEnhance.Brightness(base).enhance(0.4)
+
+    disconnected = ImageOps.grayscale(base).convert("RGBA")
+    disconnected.putalpha(base.getchannel("A"))
+    draw = ImageDraw.Draw(disconnected)
+    size = min(base.size) // 3
+    width, height = base.size
+    draw.ellipse((width - size, height - size, width - 1, height - 1), fill=(220, 40, 40, 255))
+
+    tray_icons.update({
+        STATE_ACTIVE: base,
+        STATE_IDLE: idle,
+        STATE_DISCONNECTED: disconnected,
+    })
+
+
+def tray_status_text():
+    status = f"Keyboard: {tray_state}"
+    if last_transition_latency is not None:
+        status += f" (last change {last_transition_latency * 1000:.0f} ms)"
+    return status
+
+
+def update_tray(state, latency=None):
+    """Show a new state in the tray, only call this on real changes"""
+    global tray_state, last_transition_latency
+    if state == tray_state and latency is None:
+        return
+    tray_state = state
+    if latency is not None:
+        last_transition_latency = latency
+
+    if tray_icon is not None:
+        tray_icon.icon = tray_icons[state]
+        tray_icon.title = f"GMMK Sleep! - {tray_status_text()}"
+        tray_icon.update_menu()
+
+
 def create_tray_icon():
-    icon_image = Image.open(os.path.join(os.path.dirname(__file__), "icon.png"))
+    """Create the tray icon, call before main_loop() can update it"""
+    global tray_icon
     menu = pystray.Menu(
+        pystray.MenuItem(lambda item: tray_status_text(), None, enabled=False),
+        pystray.Menu.SEPARATOR,
         pystray.MenuItem("Settings", on_settings),
+        pystray.MenuItem("Profiling", on_toggle_profiling, checked=lambda item: profiler.enabled),
         pystray.MenuItem("Exit", on_exit)
     )
-    icon = pystray.Icon("gmmk_sleep", icon_image, "GMMK Sleep!", menu=menu)
-    icon.run()
+    tray_icon = pystray.Icon("gmmk_sleep", tray_icons[tray_state],
+                             f"GMMK Sleep! - {tray_status_text()}", menu=menu)
 
 
 def get_display_timeout():
@@ -132,7 +219,8 @@ def get_display_timeout():
     return timeout * 1000
 
 
-def is_system_active(timeout):
+def get_idle_time():
+    """Return the time since the last user input in milliseconds"""
     class LASTINPUTINFO(ctypes.Structure):
         _fields_ = [
             ('cbSize', ctypes.c_uint),
@@ -150,78 +238,128 @@ def is_system_active(timeout):
 
     current_tick = kernel32.GetTickCount()
     user32.GetLastInputInfo(ctypes.byref(last_input))
-    idle_time = current_tick - last_input.dwTime
+    return current_tick - last_input.dwTime
+
+
+def is_system_active(timeout, idle_time=None):
+    if idle_time is None:
+        idle_time = get_idle_time()
     
     #print(f"Debug: idle_time={idle_time}ms, timeout={timeout}ms, idle_time < timeout = {idle_time < timeout}")
     
     return idle_time < timeout
 
 
+def open_history():
+    """Open the history ring file, history is disabled if that fails"""
+    global history_ring
+    try:
+        history_ring = history.HistoryRing()
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not open history file - {e}")
+        history_ring = None
+
+
+def record_history(kind, flag, value):
+    if history_ring is not None:
+        history_ring.append(kind, flag, value)
+
+
 def find_device_path():
-    devices = hid.enumerate(VENDOR_ID, PRODUCT_ID)
-    for device in devices:
-        if (device['interface_number'] == INTERFACE and
-                device['usage_page'] == 0xFF01):
-            print(
-                f"Found device: Interface={device.get('interface_number', -1)}, Usage Page={device.get('usage_page', 0):04x}")
-            return device['path']
+    devices = device_registry.find(VENDOR_ID, PRODUCT_ID, INTERFACE, PROTOCOL.usage_page)
+    if devices:
+        device = devices[0]
+        print(
+            f"Found device: Interface={device.get('interface_number', -1)}, Usage Page={device.get('usage_page', 0):04x}")
+        return device['path']
     return None
 
 
 def send_report(report):
-    device_path = find_device_path()
-    if not device_path:
-        # Try without usage page check as fallback
-        devices = hid.enumerate(VENDOR_ID, PRODUCT_ID)
-        for device in devices:
-            if device['interface_number'] == INTERFACE:
-                device_path = device['path']
-                break
+    with profiler.phase("enumeration"):
+        try:
+            device_path = find_device_path()
+            if not device_path:
+                # Try without usage page check as fallback
+                device_path = device_registry.find_path(VENDOR_ID, PRODUCT_ID, INTERFACE)
+        except Exception as e:
+            # Enumeration timed out or the HID worker is stopped
+            print(f"Warning: Could not enumerate devices - {e}")
+            device_path = None
 
     if not device_path:
         print(f"Warning: Device with interface {INTERFACE} not found - keyboard may be disconnected")
+        # Make sure the next attempt sees a fresh enumeration
+        device_registry.invalidate()
+        record_history(history.KIND_SEND, False, 0)
         return False
 
+    send_start = time.perf_counter()
     try:
-        device = hid.Device(path=device_path)
-        device.send_feature_report(bytes(report))
+        hid_worker.send_feature_report(device_path, report).result(HID_TIMEOUT)
         print("Feature report sent successfully")
-        device.close()
-        return True
+        success = True
 
     except Exception as e:
         print(f"Warning: Could not send report to device - {e}")
-        return False
+        # The cached path may be stale (unplugged or re-enumerated device)
+        device_registry.invalidate()
+        success = False
+
+    record_history(history.KIND_SEND, success, (time.perf_counter() - send_start) * 1e6)
+    return success
 
 
 def main_loop():
-    display_timeout = get_display_timeout()
+    with profiler.phase("timeout query"):
+        display_timeout = get_display_timeout()
     last_state = is_system_active(display_timeout)
-    device_connected = True
     reconnect_attempts = 0
+    open_history()
     
     print(f"System state: {'ACTIVE' if last_state else 'IDLE'}")
-    find_device_path()
+    print(f"Using protocol: {PROTOCOL.name}")
+    if PROTOCOL is protocols.DEFAULT_PROTOCOL:
+        print(f"Warning: No protocol registered for {VENDOR_ID:04X}:{PRODUCT_ID:04X}, "
+              "sending GMMK 2 profile reports anyway")
+    try:
+        device_connected = (find_device_path() or
+                            device_registry.find_path(VENDOR_ID, PRODUCT_ID, INTERFACE)) is not None
+    except Exception as e:
+        print(f"Warning: Could not enumerate devices - {e}")
+        device_connected = False
+    if device_connected:
+        update_tray(STATE_ACTIVE if last_state else STATE_IDLE)
+    else:
+        print("Device not found - will retry when reconnected")
+        update_tray(STATE_DISCONNECTED)
     
     while not stop_event.is_set():
-        current_state = is_system_active(display_timeout)
+        with profiler.phase("idle query"):
+            idle_time = get_idle_time()
+            current_state = is_system_active(display_timeout, idle_time)
+        record_history(history.KIND_IDLE, current_state, idle_time)
         print(f"System state: {'ACTIVE' if current_state else 'IDLE'}")
 
         if current_state != last_state:
             print("System activity changed, updating keyboard lighting...")
-            report = [0x07, 0x01, 0x01, 0x01] if current_state else [0x07, 0x01, 0x02, 0x01]
-            report += [0x00] * (REPORT_LENGTH - 4)
+            report = PROTOCOL.report_for(current_state)
             
+            transition_start = time.perf_counter()
             success = send_report(report)
             if success:
                 last_state = current_state
+                record_history(history.KIND_TRANSITION, current_state, idle_time)
                 print("Keyboard lighting updated successfully")
                 device_connected = True
                 reconnect_attempts = 0
+                update_tray(STATE_ACTIVE if current_state else STATE_IDLE,
+                            time.perf_counter() - transition_start)
             else:
                 if device_connected:
                     print("Device disconnected - will retry when reconnected")
                     device_connected = False
+                    update_tray(STATE_DISCONNECTED)
                 reconnect_attempts += 1
                 
                 # Try to reconnect less frequently after multiple failures
@@ -234,28 +372,58 @@ def main_loop():
             if not device_connected and reconnect_attempts % 5 == 0:
                 print("Attempting to reconnect to device...")
                 # Try sending current state to check if device is back
-                report = [0x07, 0x01, 0x01, 0x01] if current_state else [0x07, 0x01, 0x02, 0x01]
-                report += [0x00] * (REPORT_LENGTH - 4)
+                report = PROTOCOL.report_for(current_state)
                 
                 if send_report(report):
                     print("Device reconnected successfully!")
                     device_connected = True
                     reconnect_attempts = 0
                     last_state = current_state
+                    # The keyboard was switched to this state again, count it
+                    record_history(history.KIND_TRANSITION, current_state, idle_time)
+                    update_tray(STATE_ACTIVE if current_state else STATE_IDLE)
                     
-        time.sleep(2)
+        sleep_start = time.perf_counter()
+        time.sleep(SLEEP_INTERVAL)
+        profiler.record("sleep overshoot", time.perf_counter() - sleep_start - SLEEP_INTERVAL)
     sys.exit(0)
 
 
-def run_script():
-    # Start the tray icon in a separate thread
-    tray_thread = threading.Thread(target=create_tray_icon, daemon=True)
+def run_script(profile=False):
+    hid_worker.phase_timer = profiler.phase
+    hid_worker.start()
+    if profile:
+        start_profiling()
+
+    render_tray_icons()
+    # Build the tray icon here so update_tray() always sees it, only run it
+    # in a separate thread
+    create_tray_icon()
+    tray_thread = threading.Thread(target=tray_icon.run, daemon=True)
     tray_thread.start()
-    main_loop()
+    try:
+        main_loop()
+    finally:
+        hid_worker.stop(timeout=HID_TIMEOUT)
+        if history_ring is not None:
+            history_ring.close()
+        profiler.stop()
+        write_profile()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Turn off the GMMK lights when the display turns off")
+    parser.add_argument("--profile", action="store_true",
+                        help="record hot-path timings and write them on exit")
+    parser.add_argument("--profile-window", type=int, default=PROFILE_WINDOW,
+                        help=f"seconds of stack sampling when profiling (default {PROFILE_WINDOW})")
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
+    args = parse_args()
+    PROFILE_WINDOW = args.profile_window
     try:
-        run_script()
+        run_script(profile=args.profile)
     except Exception as e:
         print(f"Error: {e}")
@@ -0,0 +1,156 @@
+"""Lightweight profiling for the main loop.
+
+Phase timings are collected with time.perf_counter() around the hot-path
+calls of a main_loop iteration. While profiling is disabled phase() hands
+out a shared no-op context manager, so the instrumentation costs a single
+attribute check. Optionally a sampling profiler records the stack of the
+profiled threads for a fixed window and writes it in the folded format used
+by flamegraph.pl / speedscope.
+"""
+import contextlib
+import os
+import sys
+import threading
+import time
+
+_NULL_PHASE = contextlib.nullcontext()
+
+
+class PhaseStats:
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+
+class _Phase:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.phases = {}
+        self.samples = {}
+        self._lock = threading.Lock()
+        self._sampler = None
+        self._sampler_stop = threading.Event()
+
+    def phase(self, name):
+        """Time the enclosed block as phase 'name' (no-op when disabled)"""
+        if not self.enabled:
+            return _NULL_PHASE
+        return _Phase(self, name)
+
+    def record(self, name, seconds):
+        """Add a timing for a phase measured by the caller"""
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self.phases.get(name)
+            if stats is None:
+                stats = self.phases[name] = PhaseStats()
+            stats.add(seconds)
+
+    def start(self, sample_window=None, interval=0.005, threads=None):
+        """Enable phase timings and optionally sample 'threads' for sample_window seconds.
+
+        'threads' defaults to the main thread. Each sampled stack is rooted
+        at the name of its thread.
+
+        Starting a new session drops the timings and samples of the last one.
+        """
+        if not self.enabled:
+            with self._lock:
+                self.phases = {}
+                self.samples = {}
+        self.enabled = True
+        if sample_window and (self._sampler is None or not self._sampler.is_alive()):
+            targets = {thread.ident: thread.name
+                       for thread in threads or [threading.main_thread()]
+                       if thread is not None and thread.ident is not None}
+            self._sampler_stop.clear()
+            self._sampler = threading.Thread(
+                target=self._sample, args=(targets, sample_window, interval), daemon=True)
+            self._sampler.start()
+
+    def stop(self):
+        """Disable phase timings and stop the sampler"""
+        self.enabled = False
+        self._sampler_stop.set()
+        if self._sampler is not None:
+            self._sampler.join(timeout=1)
+            self._sampler = None
+
+    def _sample(self, targets, window, interval):
+        deadline = time.monotonic() + window
+        while not self._sampler_stop.wait(interval) and time.monotonic() < deadline:
+            frames = sys._current_frames()
+            if not any(thread_id in frames for thread_id in targets):
+                break
+            for thread_id, name in targets.items():
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(name)
+                key = ";".join(reversed(stack))
+                with self._lock:
+                    self.samples[key] = self.samples.get(key, 0) + 1
+        print("Profiler: sampling window finished")
+
+    def summary(self):
+        """Return a text table of the phase timings"""
+        lines = [f"{'phase':<22}{'count':>8}{'mean ms':>12}{'max ms':>12}{'total s':>12}"]
+        with self._lock:
+            for name, stats in sorted(self.phases.items(), key=lambda item: -item[1].total):
+                mean = stats.total / stats.count if stats.count else 0.0
+                lines.append(f"{name:<22}{stats.count:>8}{mean * 1000:>12.3f}"
+                             f"{stats.max * 1000:>12.3f}{stats.total:>12.3f}")
+        return "\n".join(lines)
+
+    def write(self, directory):
+        """Write profile_summary.txt and profile.folded to 'directory'"""
+        summary_path = os.path.join(directory, "profile_summary.txt")
+        with open(summary_path, 'w') as f:
+            f.write(self.summary() + "\n")
+        print(f"Profiler: summary written to {summary_path}")
+
+        with self._lock:
+            samples = dict(self.samples)
+        if samples:
+            folded_path = os.path.join(directory, "profile.folded")
+            with open(folded_path, 'w') as f:
+                for stack, count in samples.items():
+                    f.write(f"{stack} {count}\n")
+            print(f"Profiler: flame graph stacks written to {folded_path}")
+
+    def has_data(self):
+        return bool(self.phases or self.samples)
+
+
+profiler = Profiler()
@@ -0,0 +1,77 @@
+"""Keyboard protocol registry.
+
+Every supported keyboard model is described by a KeyboardProtocol that knows
+which HID interface and usage page to talk to, how long its feature reports
+are and which commands it understands. The report buffers for the commands
+used by the main loop are built once, when the protocol is registered, so
+switching lighting on a state change is a dictionary lookup.
+"""
+
+
+class KeyboardProtocol:
+    """Describe how to talk to one keyboard model"""
+
+    # Profile select from Wireshark: 07 01 <profile> 01, zero padded
+    PROFILE_SELECT = (0x07, 0x01, None, 0x01)
+
+    def __init__(self, name, interface=2, usage_page=0xFF01, report_length=256,
+                 active_profile=1, idle_profile=2, commands=None):
+        self.name = name
+        self.interface = interface  # Interface from Wireshark
+        self.usage_page = usage_page
+        self.report_length = report_length  # wLength from Wireshark
+
+        # Command templates, None marks the byte that takes the argument.
+        # Brightness has not been captured for any model yet, models that
+        # support it can pass a 'brightness' template here.
+        self.commands = {"profile": self.PROFILE_SELECT}
+        if commands:
+            self.commands.update(commands)
+
+        # Precomputed, immutable reports for the two lighting states
+        self.active_report = self.build_report("profile", active_profile)
+        self.idle_report = self.build_report("profile", idle_profile)
+
+    def build_report(self, command, value):
+        """Build a padded feature report for a command, returns bytes"""
+        template = self.commands.get(command)
+        if template is None:
+            raise KeyError(f"{self.name} does not support the '{command}' command")
+        if len(template) > self.report_length:
+            raise ValueError(f"'{command}' does not fit in a {self.report_length} byte report")
+
+        report = bytearray(self.report_length)
+        for i, byte in enumerate(template):
+            report[i] = value if byte is None else byte
+        return bytes(report)
+
+    def report_for(self, active):
+        """Return the report for the ACTIVE (True) or IDLE (False) state"""
+        return self.active_report if active else self.idle_report
+
+    def __repr__(self):
+        return (f"KeyboardProtocol({self.name!r}, interface={self.interface}, "
+                f"usage_page=0x{self.usage_page:04X}, report_length={self.report_length})")
+
+
+# Used for any VID/PID not in the registry. It assumes the GMMK 2 protocol,
+# so whatever device is configured in settings.json gets sent GMMK 2
+# profile-select reports on interface 2 / usage page 0xFF01, unverified.
+DEFAULT_PROTOCOL = KeyboardProtocol("GMMK (generic, unverified)")
+
+PROTOCOLS = {}
+
+
+def register(vendor_id, product_id, protocol):
+    """Register a protocol for a VID/PID pair"""
+    PROTOCOLS[(vendor_id, product_id)] = protocol
+
+
+def get_protocol(vendor_id, product_id):
+    """Look up the protocol for a VID/PID pair, falls back to DEFAULT_PROTOCOL"""
+    return PROTOCOLS.get((vendor_id, product_id), DEFAULT_PROTOCOL)
+
+
+# Only models whose protocol has been captured with Wireshark belong here,
+# the GMMK 2 96% UK ISO is the only one so far.
+register(0x320F, 0x505A, KeyboardProtocol("GMMK 2 Full (96%)"))
@@ -2,7 +2,8 @@ import json
 import os
 import tkinter as tk
 from tkinter import ttk, messagebox
-import ctypes
+
+from hid.registry import device_registry
 
 
 class SettingsWindow:
@@ -27,13 +28,8 @@ class SettingsWindow:
         self.window.resizable(True, True)
         self.window.minsize(500, 350)
         
-        # Load the hidapi.dll from the project directory
-        dll_path = os.path.join(os.path.dirname(__file__), "hidapi.dll")
-        ctypes.CDLL(dll_path)
-        
-        # Import hid after loading the DLL
-        import hid
-        self.hid = hid
+        # Enumeration goes through the shared registry and HID worker thread
+        self.device_registry = device_registry
         
         self.settings_path = os.path.join(os.path.dirname(__file__), "settings.json")
         self.devices = []
@@ -87,7 +83,7 @@ class SettingsWindow:
         refresh_btn = tk.Button(
             button_frame,
             text="Refresh Devices",
-            command=self.load_devices,
+            command=self.refresh_devices,
             width=15
         )
         refresh_btn.pack(side=tk.LEFT, padx=5)
@@ -128,7 +124,7 @@ class SettingsWindow:
         seen_devices = set()
         
         try:
-            all_devices = self.hid.enumerate()
+            all_devices = self.device_registry.devices()
             
             for device in all_devices:
                 vendor_id = device.get('vendor_id', 0)
@@ -173,6 +169,11 @@ class SettingsWindow:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to enumerate devices: {e}")
     
+    def refresh_devices(self):
+        """Force a new enumeration and reload the device list"""
+        self.device_registry.invalidate()
+        self.load_devices()
+    
     def load_current_settings(self):
         """Load and display current settings"""
         try:
@@ -0,0 +1,102 @@
+import os
+import sys
+
+import pytest
+
+if not sys.platform.startswith('linux'):
+    pytest.skip('hidraw is Linux only', allow_module_level=True)
+
+# Never let the hid package pick (or require) libhidapi here
+os.environ.setdefault('HID_BACKEND', 'hidraw')
+
+from hid import hidraw
+from hid._common import BusType
+
+# Vendor page 0xFF01 / usage 1 with a 64 byte feature report, then a
+# standard keyboard (Generic Desktop / Keyboard)
+GMMK_DESCRIPTOR = bytes([
+    0x06, 0x01, 0xFF, 0x09, 0x01, 0xA1, 0x01,
+    0x09, 0x02, 0x75, 0x08, 0x95, 0x40, 0xB1, 0x02, 0xC0,
+    0x05, 0x01, 0x09, 0x06, 0xA1, 0x01, 0xC0,
+])
+
+
+@pytest.fixture
+def fake_hidraw(tmp_path):
+    calls = []
+
+    def fake_ioctl(fd, request, buf):
+        calls.append((request, bytes(buf)))
+        return len(buf)
+
+    sysfs_root, dev_root = hidraw.build_fake_tree(str(tmp_path), [
+        {
+            'vendor_id': 0x320F,
+            'product_id': 0x505A,
+            'interface_number': 2,
+            'manufacturer_string': 'Glorious',
+            'product_string': 'GMMK 2 96%',
+            'serial_number': 'ABC123',
+            'release_number': 0x0102,
+            'report_descriptor': GMMK_DESCRIPTOR,
+        },
+        {
+            'vendor_id': 0x046D,
+            'product_id': 0xC077,
+            'product_string': 'Mouse',
+            'report_descriptor': bytes([0x05, 0x01, 0x09, 0x02, 0xA1, 0x01, 0xC0]),
+        },
+    ])
+    hidraw.configure(sysfs_root, dev_root, ioctl=fake_ioctl)
+    yield dev_root, calls
+    hidraw.configure()
+
+
+def test_top_level_usages():
+    assert hidraw._top_level_usages(GMMK_DESCRIPTOR) == [(0xFF01, 1), (0x01, 6)]
+
+
+def test_top_level_usages_extended_usage():
+    # 4 byte Usage carrying usage page 0x0001 and usage 0x0006
+    descriptor = bytes([0x0B, 0x06, 0x00, 0x01, 0x00, 0xA1, 0x01, 0xC0])
+    assert hidraw._top_level_usages(descriptor) == [(1, 6)]
+
+
+def test_enumerate(fake_hidraw):
+    dev_root, _ = fake_hidraw
+
+    devices = hidraw.enumerate(0x320F, 0x505A)
+    assert [(d['usage_page'], d['usage']) for d in devices] == [(0xFF01, 1), (0x01, 6)]
+    for device in devices:
+        assert device['path'] == (dev_root + '/hidraw0').encode()
+        assert device['interface_number'] == 2
+        assert device['manufacturer_string'] == 'Glorious'
+        assert device['product_string'] == 'GMMK 2 96%'
+        assert device['serial_number'] == 'ABC123'
+        assert device['release_number'] == 0x0102
+        assert device['bus_type'] is BusType.USB
+
+    assert len(hidraw.enumerate()) == 3
+    assert hidraw.enumerate(0x1234) == []
+
+
+def test_send_feature_report(fake_hidraw):
+    dev_root, calls = fake_hidraw
+    report = bytes([0x07, 0x01, 0x02, 0x01]) + bytes(252)
+
+    with hidraw.Device(path=(dev_root + '/hidraw0').encode()) as device:
+        assert device.send_feature_report(report) == 256
+        assert device.product == 'GMMK 2 96%'
+
+    # _IOC(_IOC_READ | _IOC_WRITE, 'H', 0x06, 256)
+    assert calls == [(0xC1004806, report)]
+
+
+def test_get_feature_report(fake_hidraw):
+    dev_root, calls = fake_hidraw
+
+    with hidraw.Device(0x320F, 0x505A) as device:
+        assert device.get_feature_report(7, 8) == bytes([7]) + bytes(7)
+
+    # _IOC(_IOC_READ | _IOC_WRITE, 'H', 0x07, 8)
+    assert calls == [(0xC0084807, bytes([7]) + bytes(7))]
@@ -0,0 +1,80 @@
+import pytest
+
+import history
+
+
+def write_records(path, values, capacity):
+    ring = history.HistoryRing(str(path), capacity=capacity)
+    for i, value in enumerate(values):
+        ring.append(history.KIND_IDLE, 1, value, timestamp=1000.0 + i)
+    ring.close()
+
+
+def test_records_are_read_back_in_order(tmp_path):
+    path = tmp_path / 'history.bin'
+    write_records(path, [10, 20, 30], capacity=8)
+
+    records = history.read_records(str(path))
+    assert [r.value for r in records] == [10, 20, 30]
+    assert records[0] == history.Record(1000.0, history.KIND_IDLE, 1, 10)
+
+
+def test_ring_wraps_around(tmp_path):
+    path = tmp_path / 'history.bin'
+    write_records(path, range(10), capacity=4)
+
+    assert [r.value for r in history.read_records(str(path))] == [6, 7, 8, 9]
+    assert path.stat().st_size == history.HEADER_SIZE + 4 * history.RECORD.size
+
+
+def test_reopening_keeps_the_count(tmp_path):
+    path = tmp_path / 'history.bin'
+    write_records(path, [1, 2, 3], capacity=8)
+
+    ring = history.HistoryRing(str(path), capacity=8)
+    assert ring.count == 3
+    ring.append(history.KIND_SEND, 0, 42)
+    ring.close()
+
+    records = history.read_records(str(path))
+    assert [r.value for r in records] == [1, 2, 3, 42]
+    assert records[-1].kind == history.KIND_SEND
+
+
+def test_capacity_change_resets_the_file(tmp_path):
+    path = tmp_path / 'history.bin'
+    write_records(path, [1, 2, 3], capacity=8)
+
+    ring = history.HistoryRing(str(path), capacity=16)
+    assert ring.count == 0
+    ring.close()
+
+    assert history.read_records(str(path)) == []
+
+
+@pytest.mark.parametrize('data', [
+    b'',
+    b'GMSH',
+    b'XXXX' + bytes(100),
+])
+def test_invalid_files_raise_value_error(tmp_path, data):
+    path = tmp_path / 'history.bin'
+    path.write_bytes(data)
+
+    with pytest.raises(ValueError):
+        history.read_records(str(path))
+
+
+def test_truncated_records_raise_value_error(tmp_path):
+    path = tmp_path / 'history.bin'
+    write_records(path, [1, 2, 3], capacity=8)
+    path.write_bytes(path.read_bytes()[:history.HEADER_SIZE + history.RECORD.size])
+
+    with pytest.raises(ValueError):
+        history.read_records(str(path))
+
+
+def test_idle_periods():
+    records = [history.Record(0, history.KIND_IDLE, 1, value)
+               for value in (0, 2000, 4000, 100, 2100, 0)]
+    assert history.idle_periods(records) == [4.0, 2.1]
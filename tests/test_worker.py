@@ -0,0 +1,141 @@
+import os
+import sys
+import threading
+from concurrent.futures import CancelledError
+
+import pytest
+
+if not sys.platform.startswith('linux'):
+    pytest.skip('the fake device tree needs the Linux hidraw backend', allow_module_level=True)
+
+os.environ.setdefault('HID_BACKEND', 'hidraw')
+
+import hid
+from hid import hidraw
+from hid.worker import HIDWorker
+
+TIMEOUT = 5
+
+
+@pytest.fixture
+def fake_device(tmp_path, monkeypatch):
+    """A single fake keyboard, returns its path and a log of opens and ioctls"""
+    log = []
+
+    def fake_ioctl(fd, request, buf):
+        log.append(('ioctl', bytes(buf)))
+        return len(buf)
+
+    class LoggingDevice(hidraw.Device):
+        def __init__(self, *args, **kwargs):
+            log.append(('open',))
+            super().__init__(*args, **kwargs)
+
+    sysfs_root, dev_root = hidraw.build_fake_tree(str(tmp_path), [
+        {'vendor_id': 0x320F, 'product_id': 0x505A, 'interface_number': 2},
+    ])
+    hidraw.configure(sysfs_root, dev_root, ioctl=fake_ioctl)
+    monkeypatch.setattr(hid, 'Device', LoggingDevice)
+    yield (dev_root + '/hidraw0').encode(), log
+    hidraw.configure()
+
+
+@pytest.fixture
+def worker():
+    worker = HIDWorker()
+    yield worker
+    worker.stop(timeout=TIMEOUT)
+
+
+def blocked(worker):
+    """Keep the worker busy until the returned event is set, so work queues up"""
+    release = threading.Event()
+    started = threading.Event()
+
+    def wait():
+        started.set()
+        release.wait(TIMEOUT)
+
+    worker.submit(wait)
+    assert started.wait(TIMEOUT)
+    return release
+
+
+def test_sends_to_the_same_device_share_one_open(worker, fake_device):
+    path, log = fake_device
+
+    release = blocked(worker)
+    first = worker.send_feature_report(path, b'\x07\x01\x01\x01')
+    second = worker.send_feature_report(path, b'\x07\x01\x02\x01')
+    release.set()
+
+    assert first.result(TIMEOUT) == 4
+    assert second.result(TIMEOUT) == 4
+    assert log == [('open',), ('ioctl', b'\x07\x01\x01\x01'), ('ioctl', b'\x07\x01\x02\x01')]
+
+
+def test_identical_enumerations_run_once(worker, fake_device, monkeypatch):
+    calls = []
+    enumerate = hid.enumerate
+
+    def counting_enumerate(*args):
+        calls.append(args)
+        return enumerate(*args)
+
+    monkeypatch.setattr(hid, 'enumerate', counting_enumerate)
+
+    release = blocked(worker)
+    futures = [worker.enumerate(), worker.enumerate(), worker.enumerate(0x320F, 0)]
+    release.set()
+
+    results = [future.result(TIMEOUT) for future in futures]
+    assert results[0] == results[1]
+    assert [d['vendor_id'] for d in results[2]] == [0x320F]
+    assert sorted(calls) == [(0, 0), (0x320F, 0)]
+
+
+def test_open_failure_fails_every_combined_send(worker, fake_device, tmp_path):
+    _, log = fake_device
+    missing = str(tmp_path / 'dev' / 'hidraw9').encode()
+
+    release = blocked(worker)
+    futures = [worker.send_feature_report(missing, b'\x01'),
+               worker.send_feature_report(missing, b'\x02')]
+    release.set()
+
+    for future in futures:
+        with pytest.raises(hid.HIDException):
+            future.result(TIMEOUT)
+    assert ('ioctl', b'\x01') not in log
+
+
+def test_cancelled_send_is_skipped(worker, fake_device):
+    path, log = fake_device
+
+    release = blocked(worker)
+    cancelled = worker.send_feature_report(path, b'\x01')
+    kept = worker.send_feature_report(path, b'\x02')
+    assert cancelled.cancel()
+    release.set()
+
+    assert kept.result(TIMEOUT) == 1
+    with pytest.raises(CancelledError):
+        cancelled.result(TIMEOUT)
+    assert log == [('open',), ('ioctl', b'\x02')]
+
+
+def test_submit_after_stop_fails_without_respawning(worker, fake_device):
+    path, log = fake_device
+    worker.start()
+    thread = worker.thread
+
+    worker.stop(timeout=TIMEOUT)
+    assert not thread.is_alive()
+
+    future = worker.send_feature_report(path, b'\x01')
+    with pytest.raises(hid.HIDException):
+        future.result(TIMEOUT)
+    with pytest.raises(hid.HIDException):
+        worker.start()
+    assert worker.thread is None
+    assert log == []